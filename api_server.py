@@ -1,317 +1,165 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
-import tempfile
-import json
-from datetime import datetime
-
-# Load environment variables
-load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-
-# Initialize FastAPI
-app = FastAPI(title="AI Interview Bot API", version="1.0.0")
-
-# Enable CORS for web integration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Change to your frontend URL in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize models
-genai.configure(api_key=GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel("gemini-2.0-flash")
-
-# Lazy load whisper model
-whisper_model = None
-
-def get_whisper_model():
-    global whisper_model
-    if whisper_model is None:
-        import whisper
-        whisper_model = whisper.load_model("small")
-    return whisper_model
-
-# In-memory session storage (use Redis/DB in production)
-sessions = {}
-
-# Request/Response Models
-class StartInterviewRequest(BaseModel):
-    mode: str  # "role" or "resume"
-    content: str  # job role or resume text
-    session_id: Optional[str] = None
+"""Full deployment entry point: core interview API plus Whisper transcription.
 
-class StartInterviewResponse(BaseModel):
-    session_id: str
-    first_question: str
-    message: str
+Set WHISPER_ENABLED=0 to serve the core API without importing the speech
+stack (or run `simple_api_server.py`, which never registers it at all).
+"""
 
-class SubmitAnswerRequest(BaseModel):
-    session_id: str
-    answer: str
-
-class SubmitAnswerResponse(BaseModel):
-    feedback: str
-    next_question: Optional[str]
-    is_followup: bool
-    interview_complete: bool
-    final_feedback: Optional[str]
-
-class SessionStatus(BaseModel):
-    session_id: str
-    mode: str
-    question_count: int
-    total_exchanges: int
-    current_question: str
-    interview_active: bool
-
-
-# API Endpoints
+import os
 
-@app.get("/")
-def root():
-    return {
-        "message": "AI Interview Bot API",
-        "version": "1.0.0",
-        "endpoints": {
-            "start_interview": "/api/interview/start",
-            "submit_answer": "/api/interview/answer",
-            "transcribe_audio": "/api/interview/transcribe",
-            "get_status": "/api/interview/status/{session_id}",
-            "end_interview": "/api/interview/end/{session_id}"
-        }
-    }
+from interview_core import app, REDIS_URL
+
+WHISPER_ENABLED = os.getenv("WHISPER_ENABLED", "1") == "1"
+
+if WHISPER_ENABLED:
+    # Speech-stack imports live under the flag so WHISPER_ENABLED=0 serves
+    # the core API without paying for them
+    from fastapi import BackgroundTasks, HTTPException, UploadFile, File
+    import asyncio
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from celery import Celery
+    from celery.result import AsyncResult
+    from celery.signals import worker_process_init
+
+    from interview_core import startup_hooks
+
+    # Set LAZY_LOAD=1 to defer Whisper loading to the first transcription
+    # (useful when a deployment rarely or never transcribes)
+    LAZY_LOAD = os.getenv("LAZY_LOAD", "0") == "1"
+
+    # Lazy load whisper model (faster-whisper / CTranslate2 backend)
+    WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+    # Size of the thread pool running blocking transcriptions; match this to
+    # the number of concurrent streams the device can actually serve
+    WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", "2"))
+    WHISPER_COMPUTE_TYPE = os.getenv(
+        "WHISPER_COMPUTE_TYPE", "int8" if WHISPER_DEVICE == "cpu" else "float16"
+    )
 
-@app.post("/api/interview/start", response_model=StartInterviewResponse)
-def start_interview(request: StartInterviewRequest):
-    """Start a new interview session"""
-    try:
-        session_id = request.session_id or f"session_{datetime.now().timestamp()}"
-        
-        # Generate first question
-        first_question = "Tell me about yourself"
-        
-        # Initialize session
-        sessions[session_id] = {
-            "mode": request.mode,
-            "content": request.content,
-            "conversation_history": [],
-            "question_count": 0,
-            "current_question": first_question,
-            "interview_active": True
-        }
-        
-        return StartInterviewResponse(
-            session_id=session_id,
-            first_question=first_question,
-            message="Interview started successfully"
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    whisper_model = None
 
-@app.post("/api/interview/answer", response_model=SubmitAnswerResponse)
-def submit_answer(request: SubmitAnswerRequest):
-    """Submit an answer and get feedback + next question"""
-    try:
-        session = sessions.get(request.session_id)
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        if not session["interview_active"]:
-            raise HTTPException(status_code=400, detail="Interview already ended")
-        
-        current_question = session["current_question"]
-        answer = request.answer
-        
-        # Evaluate answer
-        evaluation = evaluate_answer(current_question, answer, session["content"])
-        
-        # Store in history
-        session["conversation_history"].append({
-            "question": current_question,
-            "answer": answer,
-            "feedback": evaluation["feedback"],
-            "score": evaluation["score"],
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Check if interview should continue
-        session["question_count"] += 1
-        max_questions = 10
-        
-        if session["question_count"] >= max_questions:
-            # End interview
-            final_feedback = generate_final_feedback(session["conversation_history"])
-            session["interview_active"] = False
-            
-            return SubmitAnswerResponse(
-                feedback=evaluation["feedback"],
-                next_question=None,
-                is_followup=False,
-                interview_complete=True,
-                final_feedback=final_feedback
+    def get_whisper_model():
+        global whisper_model
+        if whisper_model is None:
+            from faster_whisper import WhisperModel
+            whisper_model = WhisperModel(
+                "small", device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE
             )
-        
-        # Generate next question or followup
-        is_followup = evaluation.get("needs_followup", False)
-        
-        if is_followup:
-            next_question = generate_followup(current_question, answer, evaluation)
-        else:
-            next_question = generate_next_question(session)
-        
-        session["current_question"] = next_question
-        
-        return SubmitAnswerResponse(
-            feedback=evaluation["feedback"],
-            next_question=next_question,
-            is_followup=is_followup,
-            interview_complete=False,
-            final_feedback=None
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        return whisper_model
 
-@app.post("/api/interview/transcribe")
-async def transcribe_audio(audio: UploadFile = File(...)):
-    """Transcribe audio file to text"""
-    try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-        
-        # Transcribe
+    def _transcribe_file(path: str) -> str:
+        """Run Whisper on an audio file and return the transcript text"""
         model = get_whisper_model()
-        result = model.transcribe(temp_path, fp16=False)
-        transcribed_text = result["text"].strip()
-        
-        # Cleanup
-        os.remove(temp_path)
-        
-        return {"transcription": transcribed_text}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
-
-@app.get("/api/interview/status/{session_id}", response_model=SessionStatus)
-def get_session_status(session_id: str):
-    """Get current interview session status"""
-    session = sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    return SessionStatus(
-        session_id=session_id,
-        mode=session["mode"],
-        question_count=session["question_count"],
-        total_exchanges=len(session["conversation_history"]),
-        current_question=session["current_question"],
-        interview_active=session["interview_active"]
+        # VAD filtering skips silent stretches, so pauses cost nothing
+        segments, _ = model.transcribe(path, vad_filter=True)
+        return "".join(segment.text for segment in segments).strip()
+
+    # Celery queue for transcription. With WHISPER_QUEUE_ENABLED=1 the
+    # transcribe endpoint enqueues a job for a dedicated (GPU-capable) worker
+    # pool instead of running the multi-second Whisper call inside the web
+    # process.
+    WHISPER_QUEUE_ENABLED = os.getenv("WHISPER_QUEUE_ENABLED", "0") == "1"
+    WHISPER_QUEUE = os.getenv("WHISPER_QUEUE", "whisper_queue")
+
+    # Staging directory for uploaded audio. Defaults to tmpfs when available
+    # so the upload write and Whisper's ffmpeg read stay in memory — but
+    # tmpfs is host-local, so queued deployments whose Celery workers run on
+    # other hosts must point AUDIO_TMP_DIR at shared storage.
+    AUDIO_TMP = os.getenv("AUDIO_TMP_DIR") or (
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
     )
 
-@app.delete("/api/interview/end/{session_id}")
-def end_interview(session_id: str):
-    """End interview and get final feedback"""
-    session = sessions.get(session_id)
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    final_feedback = generate_final_feedback(session["conversation_history"])
-    session["interview_active"] = False
-    
-    return {
-        "message": "Interview ended",
-        "final_feedback": final_feedback,
-        "total_questions": session["question_count"]
-    }
-
-
-# Helper Functions
-
-def evaluate_answer(question: str, answer: str, context: str) -> Dict:
-    """Evaluate answer using Gemini"""
-    prompt = f"""Evaluate this interview answer and return JSON:
-
-Question: {question}
-Answer: {answer}
-Context: {context}
-
-Return JSON format:
-{{
-    "feedback": "detailed feedback",
-    "is_correct": true/false,
-    "needs_followup": true/false,
-    "score": 0.0-1.0,
-    "strengths": ["strength1"],
-    "weaknesses": ["weakness1"]
-}}"""
-    
-    response = gemini_model.generate_content(prompt)
-    response_text = response.text.strip()
-    
-    if "```json" in response_text:
-        response_text = response_text.split("```json")[1].split("```")[0].strip()
-    
-    return json.loads(response_text)
-
-def generate_next_question(session: Dict) -> str:
-    """Generate next interview question"""
-    mode = session["mode"]
-    content = session["content"]
-    history = session["conversation_history"]
-    
-    history_text = "\n".join([f"Q: {h['question']}\nA: {h['answer']}" for h in history[-3:]])
-    
-    prompt = f"""Generate a technical interview question for {mode}: {content}
-
-Previous questions:
-{history_text}
-
-Return ONLY the question text."""
-    
-    response = gemini_model.generate_content(prompt)
-    return response.text.strip()
-
-def generate_followup(question: str, answer: str, evaluation: Dict) -> str:
-    """Generate follow-up question"""
-    prompt = f"""Generate a follow-up question based on:
-
-Original: {question}
-Answer: {answer}
-Issues: {', '.join(evaluation.get('weaknesses', []))}
-
-Return ONLY the follow-up question."""
-    
-    response = gemini_model.generate_content(prompt)
-    return response.text.strip()
-
-def generate_final_feedback(history: List[Dict]) -> str:
-    """Generate consolidated feedback"""
-    summary = "\n".join([
-        f"Q: {h['question']}\nA: {h['answer']}\nScore: {h['score']}"
-        for h in history
-    ])
-    
-    prompt = f"""Provide final interview feedback:
-
-{summary}
+    celery_app = Celery(
+        "interview",
+        broker=os.getenv("CELERY_BROKER_URL", REDIS_URL),
+        backend=os.getenv("CELERY_RESULT_BACKEND", REDIS_URL),
+    )
 
-Include: overall performance, strengths, improvements, recommendations."""
-    
-    response = gemini_model.generate_content(prompt)
-    return response.text.strip()
+    @worker_process_init.connect
+    def preload_whisper_in_worker(**kwargs):
+        """Warm the model in each Celery worker process before tasks arrive"""
+        if not LAZY_LOAD:
+            get_whisper_model()
+
+    @celery_app.task(name="interview.transcribe", queue=WHISPER_QUEUE)
+    def transcribe_task(path: str) -> str:
+        try:
+            return _transcribe_file(path)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    async def _preload_whisper():
+        # Bound the default executor so at most WHISPER_THREADS blocking
+        # transcriptions run at once
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=WHISPER_THREADS)
+        )
+        # Load Whisper before accepting traffic so the first /transcribe call
+        # does not pay the multi-second model load. Skipped when transcription
+        # runs on the Celery workers instead of the web process.
+        if not LAZY_LOAD and not WHISPER_QUEUE_ENABLED:
+            await asyncio.to_thread(get_whisper_model)
+
+    startup_hooks.append(_preload_whisper)
+
+    @app.post("/api/interview/transcribe")
+    async def transcribe_audio(background: BackgroundTasks, audio: UploadFile = File(...)):
+        """Transcribe audio file to text"""
+        temp_path = None
+        try:
+            # Stream the upload to disk in 1 MiB chunks so large recordings
+            # never sit fully in memory
+            with tempfile.NamedTemporaryFile(
+                delete=False, suffix=".wav", dir=AUDIO_TMP
+            ) as temp_file:
+                while chunk := await audio.read(1 << 20):
+                    temp_file.write(chunk)
+                temp_path = temp_file.name
+
+            if WHISPER_QUEUE_ENABLED:
+                # Hand off to the worker pool; the client polls for the result
+                job = transcribe_task.delay(temp_path)
+                temp_path = None  # the worker owns (and removes) the file now
+                return {"job_id": job.id, "status": "PENDING"}
+
+            # Transcribe inline (single-process deployments), in a worker
+            # thread so the event loop keeps scheduling other requests
+            transcribed_text = await asyncio.to_thread(_transcribe_file, temp_path)
+
+            # Unlink after the response goes out, off the hot path
+            background.add_task(os.remove, temp_path)
+            temp_path = None
+
+            return {"transcription": transcribed_text}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+        finally:
+            # Cleanup when transcription raises (success paths unlink elsewhere)
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @app.get("/api/interview/transcribe/{job_id}")
+    def get_transcription_result(job_id: str):
+        """Poll a queued transcription job"""
+        job = AsyncResult(job_id, app=celery_app)
+        if job.failed():
+            raise HTTPException(status_code=500, detail=f"Transcription failed: {job.result}")
+        if job.successful():
+            return {"job_id": job_id, "status": job.state, "transcription": job.result}
+        return {"job_id": job_id, "status": job.state}
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Session state lives in Redis, so workers can scale across cores;
+    # uvloop + httptools replace the slower default loop and h11 parser
+    uvicorn.run(
+        "api_server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        loop="uvloop",
+        http="httptools",
+        access_log=os.getenv("ACCESS_LOG", "0") == "1",
+    )
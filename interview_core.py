@@ -0,0 +1,570 @@
+"""Shared core of the interview API: app, models, session store, Gemini helpers.
+
+This module deliberately knows nothing about Whisper. `api_server.py` layers
+the transcription endpoints on top when WHISPER_ENABLED=1, while
+`simple_api_server.py` serves this app as-is without pulling in the speech
+stack at all.
+"""
+
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import Awaitable, Callable, Optional, List, Dict
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+import google.generativeai as genai
+import orjson
+import redis.asyncio as redis
+import uuid
+from datetime import datetime
+
+# Load environment variables
+load_dotenv()
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Async callables run during lifespan startup, before traffic is accepted.
+# api_server.py appends its Whisper preload here.
+startup_hooks: List[Callable[[], Awaitable[None]]] = []
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for hook in startup_hooks:
+        await hook()
+    yield
+
+# Initialize FastAPI
+app = FastAPI(
+    title="AI Interview Bot API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Enable CORS for web integration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Change to your frontend URL in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Reject oversized bodies from the Content-Length header, before any body
+# bytes are read or parsed; audio uploads are exempt
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(1 << 20)))  # 1 MiB
+
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    if not request.url.path.startswith("/api/interview/transcribe"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+            return ORJSONResponse(
+                status_code=413, content={"detail": "Request body too large"}
+            )
+    return await call_next(request)
+
+# Initialize models. Pinning the async gRPC transport gives all Gemini calls
+# one shared HTTP/2 channel with multiplexed streams, so concurrent requests
+# reuse the connection instead of paying TCP/TLS setup per call.
+genai.configure(
+    api_key=GEMINI_API_KEY,
+    transport=os.getenv("GEMINI_TRANSPORT", "grpc_asyncio"),
+    client_options={
+        "api_endpoint": os.getenv(
+            "GEMINI_API_ENDPOINT", "generativelanguage.googleapis.com"
+        )
+    },
+)
+# Constructed once at import time; every request reuses this model (and its
+# underlying channel) rather than building a new client
+gemini_model = genai.GenerativeModel("gemini-2.0-flash")
+
+# Redis-backed session storage (stateless API, safe for multi-worker deployment)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "900"))
+
+redis_client = redis.from_url(REDIS_URL)
+
+def _session_key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+def _history_key(session_id: str) -> str:
+    return f"session:{session_id}:history"
+
+async def load_session(session_id: str) -> Optional[Dict]:
+    raw = await redis_client.get(_session_key(session_id))
+    return orjson.loads(raw) if raw else None
+
+async def save_session(session_id: str, session: Dict):
+    await redis_client.set(
+        _session_key(session_id), orjson.dumps(session), ex=SESSION_TTL_SECONDS
+    )
+
+async def append_history(session_id: str, entry: Dict):
+    # Append + TTL refresh in one round-trip; the history lives in a Redis
+    # list so each turn is an RPUSH instead of a full blob rewrite
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.rpush(_history_key(session_id), orjson.dumps(entry))
+        pipe.expire(_history_key(session_id), SESSION_TTL_SECONDS)
+        await pipe.execute()
+
+async def delete_session(session_id: str):
+    await redis_client.delete(_session_key(session_id), _history_key(session_id))
+
+# Cache for Gemini responses, keyed by prompt hash: identical prompts
+# (canned first questions, repeated short answers) skip the LLM call
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", "3600"))
+
+def _cache_key(prompt: str) -> str:
+    return "ai_cache:" + hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+
+async def cache_get(prompt: str):
+    raw = await redis_client.get(_cache_key(prompt))
+    return orjson.loads(raw) if raw else None
+
+async def cache_put(prompt: str, value):
+    await redis_client.set(
+        _cache_key(prompt), orjson.dumps(value), ex=AI_CACHE_TTL_SECONDS
+    )
+
+# Distributed per-session lock serializing submit_answer: a double-tapped
+# submit would otherwise evaluate the same question twice (2x Gemini spend)
+# and race the session read-modify-write. SET NX EX in Redis serializes
+# across workers (the default serve config runs several); the TTL bounds how
+# long a crashed holder can block its session, and the Lua release deletes
+# the key only while this holder still owns it.
+SESSION_LOCK_TTL_SECONDS = int(os.getenv("SESSION_LOCK_TTL_SECONDS", "30"))
+
+_UNLOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+@asynccontextmanager
+async def _session_lock(session_id: str):
+    key = f"lock:session:{session_id}"
+    token = uuid.uuid4().hex
+    while not await redis_client.set(
+        key, token, nx=True, ex=SESSION_LOCK_TTL_SECONDS
+    ):
+        await asyncio.sleep(0.05)
+    try:
+        yield
+    finally:
+        await redis_client.eval(_UNLOCK_SCRIPT, 1, key, token)
+
+# Request/Response Models. Size caps fail oversized inputs fast at the
+# framework layer instead of letting them balloon a Gemini prompt.
+class StartInterviewRequest(BaseModel):
+    mode: str  # "role" or "resume"
+    content: str = Field(..., max_length=20000)  # job role or resume text
+    session_id: Optional[str] = None
+
+class StartInterviewResponse(BaseModel):
+    session_id: str
+    first_question: str
+    message: str
+
+class SubmitAnswerRequest(BaseModel):
+    session_id: str
+    answer: str = Field(..., max_length=8000)
+
+class SubmitAnswerResponse(BaseModel):
+    feedback: str
+    next_question: Optional[str]
+    is_followup: bool
+    interview_complete: bool
+    final_feedback: Optional[str]
+
+class SessionStatus(BaseModel):
+    session_id: str
+    mode: str
+    question_count: int
+    total_exchanges: int
+    current_question: str
+    interview_active: bool
+
+
+# API Endpoints
+
+@app.get("/")
+def root():
+    return {
+        "message": "AI Interview Bot API",
+        "version": "1.0.0",
+        "endpoints": {
+            "start_interview": "/api/interview/start",
+            "submit_answer": "/api/interview/answer",
+            "transcribe_audio": "/api/interview/transcribe",
+            "transcription_result": "/api/interview/transcribe/{job_id}",
+            "get_status": "/api/interview/status/{session_id}",
+            "end_interview": "/api/interview/end/{session_id}"
+        }
+    }
+
+@app.post("/api/interview/start", response_model=StartInterviewResponse)
+async def start_interview(request: StartInterviewRequest):
+    """Start a new interview session"""
+    try:
+        session_id = request.session_id or uuid.uuid4().hex
+
+        # Generate first question
+        first_question = "Tell me about yourself"
+
+        # Initialize session
+        await save_session(session_id, {
+            "mode": request.mode,
+            "content": request.content,
+            "question_count": 0,
+            "current_question": first_question,
+            "interview_active": True,
+            # Cached prompt context, maintained on each answer so the
+            # Gemini helpers never re-read or re-join the full history
+            "history_snippets": [],
+            "summary_cache": ""
+        })
+
+        return StartInterviewResponse(
+            session_id=session_id,
+            first_question=first_question,
+            message="Interview started successfully"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/interview/answer", response_model=SubmitAnswerResponse)
+async def submit_answer(request: SubmitAnswerRequest, background: BackgroundTasks):
+    """Submit an answer and get feedback + next question"""
+    try:
+        async with _session_lock(request.session_id):
+            session = await load_session(request.session_id)
+            if not session:
+                raise HTTPException(status_code=404, detail="Session not found")
+
+            if not session["interview_active"]:
+                raise HTTPException(status_code=400, detail="Interview already ended")
+
+            current_question = session["current_question"]
+            answer = request.answer
+
+            # Evaluate answer
+            evaluation = await evaluate_answer(current_question, answer, session["content"])
+
+            # Store in history after the response is sent; the reply only
+            # depends on the in-memory session updates below
+            background.add_task(append_history, request.session_id, {
+                "question": current_question,
+                "answer": answer,
+                "feedback": evaluation["feedback"],
+                "score": evaluation["score"],
+                # orjson serializes datetime natively, no isoformat() needed
+                "timestamp": datetime.now()
+            })
+
+            # Update cached prompt context: last 3 exchanges for next-question
+            # prompts, running Q/A/Score summary for the final feedback
+            snippets = session.get("history_snippets", [])
+            snippets.append(f"Q: {current_question}\nA: {answer}")
+            session["history_snippets"] = snippets[-3:]
+            session["summary_cache"] = session.get("summary_cache", "") + (
+                f"Q: {current_question}\nA: {answer}\nScore: {evaluation['score']}\n"
+            )
+
+            # Check if interview should continue
+            session["question_count"] += 1
+            max_questions = 10
+
+            if session["question_count"] >= max_questions:
+                # End interview. The save must land before the lock is
+                # released or the next submit would load the stale blob.
+                final_feedback = await generate_final_feedback(session["summary_cache"])
+                session["interview_active"] = False
+                await save_session(request.session_id, session)
+
+                return SubmitAnswerResponse(
+                    feedback=evaluation["feedback"],
+                    next_question=None,
+                    is_followup=False,
+                    interview_complete=True,
+                    final_feedback=final_feedback
+                )
+
+            # Generate next question or followup
+            is_followup = evaluation.get("needs_followup", False)
+
+            if is_followup:
+                next_question = await generate_followup(current_question, answer, evaluation)
+            else:
+                next_question = await generate_next_question(session)
+
+            # The save must land before the lock is released or the next
+            # submit would load the stale blob
+            session["current_question"] = next_question
+            await save_session(request.session_id, session)
+
+            return SubmitAnswerResponse(
+                feedback=evaluation["feedback"],
+                next_question=next_question,
+                is_followup=is_followup,
+                interview_complete=False,
+                final_feedback=None
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/interview/status/{session_id}", response_model=SessionStatus)
+async def get_session_status(session_id: str):
+    """Get current interview session status"""
+    session = await load_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return SessionStatus(
+        session_id=session_id,
+        mode=session["mode"],
+        question_count=session["question_count"],
+        total_exchanges=await redis_client.llen(_history_key(session_id)),
+        current_question=session["current_question"],
+        interview_active=session["interview_active"]
+    )
+
+@app.delete("/api/interview/end/{session_id}")
+async def end_interview(session_id: str):
+    """End interview and get final feedback"""
+    session = await load_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    final_feedback = await generate_final_feedback(session.get("summary_cache", ""))
+    await delete_session(session_id)
+
+    return {
+        "message": "Interview ended",
+        "final_feedback": final_feedback,
+        "total_questions": session["question_count"]
+    }
+
+
+# Helper Functions
+
+# Structured-output schema for answer evaluation: Gemini returns raw JSON
+# matching this shape, so no markdown-fence stripping is needed and no
+# tokens are wasted on fences
+EVAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {"type": "string"},
+        "is_correct": {"type": "boolean"},
+        "needs_followup": {"type": "boolean"},
+        "score": {"type": "number"},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "weaknesses": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["feedback", "is_correct", "needs_followup", "score"],
+}
+
+EVAL_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": EVAL_SCHEMA,
+}
+
+EVAL_BATCH_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {"type": "array", "items": EVAL_SCHEMA},
+}
+
+# Prompt templates: the static scaffolding is built once at import time and
+# each call only formats the dynamic fields
+EVAL_PROMPT_TMPL = """Evaluate this interview answer and return JSON:
+
+Question: {question}
+Answer: {answer}
+Context: {context}
+
+Return JSON format:
+{{
+    "feedback": "detailed feedback",
+    "is_correct": true/false,
+    "needs_followup": true/false,
+    "score": 0.0-1.0,
+    "strengths": ["strength1"],
+    "weaknesses": ["weakness1"]
+}}"""
+
+NEXT_QUESTION_PROMPT_TMPL = """Generate a technical interview question for {mode}: {content}
+
+Previous questions:
+{history_text}
+
+Return ONLY the question text."""
+
+FOLLOWUP_PROMPT_TMPL = """Generate a follow-up question based on:
+
+Original: {question}
+Answer: {answer}
+Issues: {issues}
+
+Return ONLY the follow-up question."""
+
+FINAL_FEEDBACK_PROMPT_TMPL = """Provide final interview feedback:
+
+{summary}
+
+Include: overall performance, strengths, improvements, recommendations."""
+
+
+class EvalBatcher:
+    """Coalesce evaluation prompts arriving within a short window into one
+    multi-prompt Gemini call, fanning results back to the waiting handlers.
+
+    Under concurrent load this amortizes per-request RPC overhead; an idle
+    server still sees single-prompt calls with at most ``window_ms`` of
+    added latency.
+    """
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self._window = window_ms / 1000.0
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, prompt: str) -> Dict:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._drain())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt, future))
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._window
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        if len(batch) == 1:
+            await self._run_single(*batch[0])
+            return
+
+        combined = (
+            f"You will be given {len(batch)} independent evaluation tasks.\n"
+            f"Return ONLY a JSON array with exactly {len(batch)} objects, "
+            f"one per task, in task order.\n\n"
+            + "\n\n---\n\n".join(
+                f"Task {i + 1}:\n{prompt}" for i, (prompt, _) in enumerate(batch)
+            )
+        )
+        try:
+            response = await gemini_model.generate_content_async(
+                combined, generation_config=EVAL_BATCH_GENERATION_CONFIG
+            )
+            results = orjson.loads(response.text)
+            if not isinstance(results, list) or len(results) != len(batch):
+                raise ValueError("batched evaluation returned wrong shape")
+        except Exception:
+            # Batch went wrong as a whole; retry each prompt on its own
+            for prompt, future in batch:
+                await self._run_single(prompt, future)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _run_single(self, prompt: str, future: asyncio.Future):
+        try:
+            response = await gemini_model.generate_content_async(
+                prompt, generation_config=EVAL_GENERATION_CONFIG
+            )
+            result = orjson.loads(response.text)
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+            return
+        if not future.done():
+            future.set_result(result)
+
+
+eval_batcher = EvalBatcher(
+    window_ms=int(os.getenv("EVAL_BATCH_WINDOW_MS", "20")),
+    max_batch=int(os.getenv("EVAL_BATCH_MAX", "8")),
+)
+
+async def evaluate_answer(question: str, answer: str, context: str) -> Dict:
+    """Evaluate answer using Gemini"""
+    prompt = EVAL_PROMPT_TMPL.format(question=question, answer=answer, context=context)
+
+    cached = await cache_get(prompt)
+    if cached is not None:
+        return cached
+
+    evaluation = await eval_batcher.submit(prompt)
+    await cache_put(prompt, evaluation)
+    return evaluation
+
+async def generate_next_question(session: Dict) -> str:
+    """Generate next interview question"""
+    mode = session["mode"]
+    content = session["content"]
+
+    history_text = "\n".join(session.get("history_snippets", []))
+
+    prompt = NEXT_QUESTION_PROMPT_TMPL.format(
+        mode=mode, content=content, history_text=history_text
+    )
+
+    cached = await cache_get(prompt)
+    if cached is not None:
+        return cached
+
+    response = await gemini_model.generate_content_async(prompt)
+    question = response.text.strip()
+    await cache_put(prompt, question)
+    return question
+
+async def generate_followup(question: str, answer: str, evaluation: Dict) -> str:
+    """Generate follow-up question"""
+    prompt = FOLLOWUP_PROMPT_TMPL.format(
+        question=question,
+        answer=answer,
+        issues=", ".join(evaluation.get("weaknesses", [])),
+    )
+
+    cached = await cache_get(prompt)
+    if cached is not None:
+        return cached
+
+    response = await gemini_model.generate_content_async(prompt)
+    followup = response.text.strip()
+    await cache_put(prompt, followup)
+    return followup
+
+async def generate_final_feedback(summary: str) -> str:
+    """Generate consolidated feedback from the session's cached summary"""
+    prompt = FINAL_FEEDBACK_PROMPT_TMPL.format(summary=summary)
+
+    cached = await cache_get(prompt)
+    if cached is not None:
+        return cached
+
+    response = await gemini_model.generate_content_async(prompt)
+    feedback = response.text.strip()
+    await cache_put(prompt, feedback)
+    return feedback